@@ -1,6 +1,9 @@
 import os
-from sqlalchemy import create_engine, inspect, text
-import pymysql # You will need to install this: pip install pymysql
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from sqlalchemy import MetaData, create_engine, inspect, text
+# pymysql is imported lazily (see get_all_shard_engines) so that SQLite-only
+# runs don't pay its import cost. Install it with: pip install pymysql
 
 # --- Configuration for MySQL Connection ---
 # These will be populated by user input in main.py
@@ -43,42 +46,269 @@ def setup_sample_database():
     ''')
     print("You will be prompted for connection details (host, port, user, password, database name) later.")
 
+# Default pool sizing for shard engines. Shard fanout during analysis reuses
+# pooled connections instead of handshaking per query, pre-ping transparently
+# replaces connections MySQL closed after wait_timeout, and recycling caps
+# connection age below typical server-side timeouts.
+DEFAULT_POOL_SIZE = 8
+DEFAULT_MAX_OVERFLOW = 4
+DEFAULT_POOL_RECYCLE = 1800
+
+@lru_cache(maxsize=None)
+def _engine_for(key):
+    """
+    Returns a (cached) SQLAlchemy engine for a (host, port, user, password,
+    db_name, pool_size, max_overflow, pool_recycle) tuple. The connection is
+    probed with SELECT 1 only on first construction; later calls reuse the
+    engine and its pool, so analysis passes that re-enumerate shards don't
+    re-handshake each time.
+    """
+    host, port, user, password, db_name, pool_size, max_overflow, pool_recycle = key
+    conn_str = f"mysql+pymysql://{user}:{password}@{host}:{port}/{db_name}"
+    # MULTI_STATEMENTS lets the analyzers batch independent read-only
+    # statements (e.g. per-shard EXPLAINs) into one round-trip.
+    from pymysql.constants import CLIENT
+    engine = create_engine(
+        conn_str,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_pre_ping=True,
+        pool_recycle=pool_recycle,
+        connect_args={'client_flag': CLIENT.MULTI_STATEMENTS},
+    )
+    # Test connection
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    return engine
+
+def clear_engine_cache():
+    """Forgets all cached engines (for teardown/tests)."""
+    _engine_for.cache_clear()
+
+# Reflected-schema cache shared by the analysis passes. Keyed by engine URL,
+# or by an explicit fingerprint when the caller knows several shards share an
+# identical schema, in which case the information_schema queries run once
+# instead of once per shard.
+_META_CACHE = {}
+
+def get_metadata(engine, schema_fingerprint=None):
+    """
+    Returns a fully reflected (and cached) MetaData for the given engine.
+    Pass schema_fingerprint to share one reflection across shards with
+    identical schemas.
+    """
+    key = schema_fingerprint or str(engine.url)
+    metadata = _META_CACHE.get(key)
+    if metadata is None:
+        metadata = MetaData()
+        metadata.reflect(bind=engine, views=True)
+        _META_CACHE[key] = metadata
+    return metadata
+
+def invalidate_metadata(fingerprint=None):
+    """Drops one cached reflection (or all of them) after schema mutations."""
+    if fingerprint is None:
+        _META_CACHE.clear()
+    else:
+        _META_CACHE.pop(fingerprint, None)
+
+def _details_key(details):
+    """
+    Builds the hashable engine-cache key from a connection-details dict.
+    Pool sizing can be overridden per shard via optional 'pool_size',
+    'max_overflow' and 'pool_recycle' keys.
+    """
+    return (details['host'], details['port'], details['user'],
+            details['password'], details['db_name'],
+            details.get('pool_size', DEFAULT_POOL_SIZE),
+            details.get('max_overflow', DEFAULT_MAX_OVERFLOW),
+            details.get('pool_recycle', DEFAULT_POOL_RECYCLE))
+
 def get_all_shard_engines(db_connection_details):
     """
     Returns a dictionary of SQLAlchemy engines for MySQL shards.
     db_connection_details is expected to be a dictionary or list of dicts
     containing 'host', 'port', 'user', 'password', 'db_name'.
+    Engines are cached per connection tuple, so repeated calls reuse them.
     """
+    # Imported here rather than at module top so loading this handler for a
+    # SQLite-only session stays cheap; fails early with a clear message if
+    # the driver is missing.
+    try:
+        import pymysql  # noqa: F401
+    except ImportError:
+        print("Error: The 'pymysql' driver is required for MySQL analysis. Install it with: pip install pymysql")
+        return {}
+
     engines = {}
     if isinstance(db_connection_details, dict): # Single database
         details = db_connection_details
         try:
-            conn_str = f"mysql+pymysql://{details['user']}:{details['password']}@{details['host']}:{details['port']}/{details['db_name']}"
-            engines[f'mysql_db_{details["db_name"]}'] = create_engine(conn_str)
-            # Test connection
-            with engines[f'mysql_db_{details["db_name"]}'].connect() as conn:
-                conn.execute(text("SELECT 1"))
+            engines[f'mysql_db_{details["db_name"]}'] = _engine_for(_details_key(details))
             print(f"  - Connected to MySQL database: {details['db_name']}")
         except Exception as e:
             print(f"Error connecting to MySQL database {details['db_name']}: {e}")
             return {}
     elif isinstance(db_connection_details, list): # Multiple shards/databases
-        for i, details in enumerate(db_connection_details):
+        # The SELECT 1 probes are pure network I/O, so testing shards
+        # concurrently collapses connect latency from the sum of the
+        # round-trips to roughly the slowest one.
+        def _connect_one(args):
+            i, details = args
             try:
-                conn_str = f"mysql+pymysql://{details['user']}:{details['password']}@{details['host']}:{details['port']}/{details['db_name']}"
-                engines[f'mysql_shard_{i+1}'] = create_engine(conn_str)
-                # Test connection
-                with engines[f'mysql_shard_{i+1}'].connect() as conn:
-                    conn.execute(text("SELECT 1"))
+                engine = _engine_for(_details_key(details))
                 print(f"  - Connected to MySQL shard {i+1}: {details['db_name']}")
+                return (f'mysql_shard_{i+1}', engine)
             except Exception as e:
                 print(f"Error connecting to MySQL shard {i+1} ({details['db_name']}): {e}")
-                continue
+                return (f'mysql_shard_{i+1}', None)
+
+        max_workers = min(32, len(db_connection_details)) or 1
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_connect_one, enumerate(db_connection_details)))
+        for key, engine in results: # ex.map preserves input (shard) order
+            if engine is not None:
+                engines[key] = engine
+    else:
+        print("Invalid connection details provided for MySQL.")
+    return engines
+
+@lru_cache(maxsize=None)
+def _async_engine_for(key):
+    """Returns a (cached) AsyncEngine for a connection-details key tuple."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    host, port, user, password, db_name, pool_size, max_overflow, pool_recycle = key
+    return create_async_engine(
+        f"mysql+asyncmy://{user}:{password}@{host}:{port}/{db_name}",
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_pre_ping=True,
+        pool_recycle=pool_recycle,
+    )
+
+def get_all_shard_engines_async(db_connection_details):
+    """
+    Async counterpart of get_all_shard_engines, returning AsyncEngines backed
+    by the asyncmy driver. The speedup only materializes if callers overlap
+    the shard queries, e.g. asyncio.gather() over one coroutine per shard;
+    awaiting them sequentially performs like the sync path.
+    Requires asyncmy: pip install asyncmy
+    """
+    try:
+        import asyncmy  # noqa: F401
+    except ImportError:
+        print("Error: The 'asyncmy' driver is required for async MySQL analysis. Install it with: pip install asyncmy")
+        return {}
+
+    engines = {}
+    if isinstance(db_connection_details, dict): # Single database
+        details = db_connection_details
+        engines[f'mysql_db_{details["db_name"]}'] = _async_engine_for(_details_key(details))
+    elif isinstance(db_connection_details, list): # Multiple shards/databases
+        for i, details in enumerate(db_connection_details):
+            engines[f'mysql_shard_{i+1}'] = _async_engine_for(_details_key(details))
     else:
         print("Invalid connection details provided for MySQL.")
     return engines
 
+# --- Bulk schema-introspection queries ---
+# These let discovery read a whole shard's metadata in two round-trips
+# instead of five inspector calls per table. Both return fixed row shapes
+# shared with the SQLite handler:
+#   columns:     (table_name, column_name, column_type, nullable, pk_position)
+#   constraints: (kind, table_name, name, column_name,
+#                 referred_table, referred_column, seq, non_unique)
+# with kind one of 'fk', 'unique' (unique index) or 'index'.
+def bulk_columns_sql():
+    """
+    Returns one query covering every table's columns in the current MySQL
+    schema. The PK position comes from KEY_COLUMN_USAGE, whose
+    ORDINAL_POSITION is the column's position *within the key* — COLUMNS'
+    ORDINAL_POSITION is its position in the table, which misorders composite
+    keys declared in a different order than their columns (matching SQLite's
+    pragma_table_info.pk semantics).
+    """
+    return """
+        SELECT c.TABLE_NAME AS table_name,
+               c.COLUMN_NAME AS column_name,
+               c.COLUMN_TYPE AS column_type,
+               IF(c.IS_NULLABLE = 'YES', 1, 0) AS nullable,
+               COALESCE(k.ORDINAL_POSITION, 0) AS pk_position
+        FROM information_schema.COLUMNS c
+        LEFT JOIN information_schema.KEY_COLUMN_USAGE k
+               ON k.TABLE_SCHEMA = c.TABLE_SCHEMA
+              AND k.TABLE_NAME = c.TABLE_NAME
+              AND k.COLUMN_NAME = c.COLUMN_NAME
+              AND k.CONSTRAINT_NAME = 'PRIMARY'
+        WHERE c.TABLE_SCHEMA = DATABASE()
+        ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION
+    """
+
+def bulk_constraints_sql():
+    """Returns one query covering every table's FKs, unique indexes and indexes in the current MySQL schema."""
+    return """
+        SELECT 'fk' AS kind,
+               TABLE_NAME AS table_name,
+               CONSTRAINT_NAME AS name,
+               COLUMN_NAME AS column_name,
+               REFERENCED_TABLE_NAME AS referred_table,
+               REFERENCED_COLUMN_NAME AS referred_column,
+               ORDINAL_POSITION AS seq,
+               0 AS non_unique
+        FROM information_schema.KEY_COLUMN_USAGE
+        WHERE TABLE_SCHEMA = DATABASE() AND REFERENCED_TABLE_NAME IS NOT NULL
+        UNION ALL
+        SELECT IF(NON_UNIQUE = 0, 'unique', 'index'),
+               TABLE_NAME,
+               INDEX_NAME,
+               COLUMN_NAME,
+               NULL,
+               NULL,
+               SEQ_IN_INDEX,
+               NON_UNIQUE
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND INDEX_NAME <> 'PRIMARY'
+        ORDER BY 1, 2, 3, 7
+    """
+
 # --- Database-specific SQL commands/keywords for MySQL ---
+def supports_batch_explain():
+    """
+    MySQL connections are opened with CLIENT.MULTI_STATEMENTS, so a shard's
+    EXPLAINs can be concatenated and sent in a single network round-trip.
+    """
+    return True
+
+def supports_concurrent_analyzers():
+    """
+    QueuePool checks out a dedicated connection per thread, so the analysis
+    passes can run in parallel and overlap their network round-trips.
+    """
+    return True
+
+def get_schema_signature_sql():
+    """
+    Returns a cheap query whose result changes whenever the schema changes,
+    used as the cache key for disk-cached schema discovery.
+    """
+    return """
+        SELECT COUNT(*), COALESCE(MAX(CREATE_TIME), '0'), COALESCE(MAX(UPDATE_TIME), '0')
+        FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE()
+    """
+
+def get_fast_count_sql(table_name):
+    """
+    Returns the cheapest row-count query available for a table. TABLE_ROWS is
+    InnoDB's stored estimate — an O(1) metadata read instead of an O(N) scan.
+    Good enough for the informational counts the analyzers report, but not
+    exact; use COUNT(*) where a precise figure matters.
+    """
+    return (
+        "SELECT TABLE_ROWS FROM information_schema.TABLES "
+        f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = '{table_name}'"
+    )
+
 def get_trigger_query_sql():
     """Returns the SQL query to get trigger information for MySQL."""
     return "SELECT TRIGGER_NAME, EVENT_OBJECT_TABLE, ACTION_STATEMENT FROM information_schema.TRIGGERS WHERE TRIGGER_SCHEMA = DATABASE();"
@@ -91,6 +321,18 @@ def get_fk_check_off_sql():
     """Returns the SQL command to disable foreign key checks for MySQL."""
     return "SET FOREIGN_KEY_CHECKS = 0;"
 
+def get_binlog_off_sql():
+    """
+    Returns the SQL to stop binlogging this session. The trigger test's
+    transaction is always rolled back, so its binlog events (and their
+    fsyncs) are pure overhead. Requires a privileged account.
+    """
+    return "SET SESSION sql_log_bin = 0"
+
+def get_binlog_on_sql():
+    """Returns the SQL to resume binlogging on this session."""
+    return "SET SESSION sql_log_bin = 1"
+
 def get_autoincrement_keyword():
     """Returns the auto-increment keyword for MySQL."""
     return "AUTO_INCREMENT"
@@ -98,3 +340,21 @@ def get_autoincrement_keyword():
 def get_explain_query_plan_prefix():
     """Returns the EXPLAIN query plan prefix for MySQL."""
     return "EXPLAIN" # MySQL's EXPLAIN output format is different, but this is the keyword
+
+def parse_explain_rows(columns, rows):
+    """
+    Classifies tabular EXPLAIN rows structurally: access type 'ALL' or
+    'index' means a full table/index walk, and a non-NULL key names the
+    index chosen; checking those columns beats substring-matching a
+    stringified plan. Returns {'full_scan': bool, 'uses_index': bool}.
+    """
+    type_idx = columns.index('type') if 'type' in columns else -1
+    key_idx = columns.index('key') if 'key' in columns else -1
+    full_scan = False
+    uses_index = False
+    for row in rows:
+        if type_idx >= 0 and str(row[type_idx]).lower() in ('all', 'index'):
+            full_scan = True
+        if key_idx >= 0 and row[key_idx] is not None:
+            uses_index = True
+    return {'full_scan': full_scan, 'uses_index': uses_index}
@@ -1,7 +1,11 @@
+import argparse
+import json
 import os
 import importlib
-from identification import ( # Import discover_schema here
-    discover_schema,
+from concurrent.futures import ThreadPoolExecutor
+from identification import ( # Import schema discovery here
+    AnalyzerSession,
+    discover_schema_cached,
     analyze_queries_dynamic,
     check_indexes_dynamic,
     check_data_integrity_dynamic,
@@ -9,37 +13,66 @@ from identification import ( # Import discover_schema here
     analyze_triggers_dynamic,
     analyze_relationships_performance
 )
-from visualization import generate_html_report # Assuming visualization.py is in the root
+from visualization import render_report_cached, write_chart_asset # Assuming visualization.py is in the root
 
-# Placeholder for the selected database handler module
-db_handler = None
+# Maps the --db-type / interactive choice to its handler module
+HANDLER_MODULES = {
+    'S': 'db_handlers.sqlite_handler',
+    'M': 'db_handlers.mysql_handler',
+}
 
-if __name__ == '__main__':
-    print("Starting dynamic database analysis tool...")
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Dynamic database health and performance analyzer."
+    )
+    parser.add_argument(
+        '--db-type', choices=sorted(HANDLER_MODULES), metavar='{S,M}',
+        help="Database type: S for SQLite, M for MySQL."
+    )
+    parser.add_argument(
+        '--shards-json', metavar='PATH',
+        help="Path to a JSON file listing the shards: SQLite file paths, or "
+             "MySQL connection dicts (host/port/user/password/db_name). "
+             "Falls back to the DBANALYZER_SHARDS environment variable "
+             "(inline JSON). Omit to analyze the bundled sample databases."
+    )
+    parser.add_argument(
+        '--gzip', action='store_true',
+        help="Write the report gzip-compressed as database_report.html.gz "
+             "(reports compress roughly 10x)."
+    )
+    parser.add_argument(
+        '--interactive', action='store_true',
+        help="Prompt for database type and connection details instead of "
+             "reading them from the command line."
+    )
+    return parser.parse_args()
 
-    db_paths = None # Initialize db_paths (for SQLite file paths) or connection details (for MySQL)
-    discovered_schema = {} # Initialize discovered_schema
+def load_shards(args):
+    """Load the shard list from --shards-json or DBANALYZER_SHARDS, if set."""
+    if args.shards_json:
+        with open(args.shards_json, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    shards_env = os.environ.get('DBANALYZER_SHARDS')
+    if shards_env:
+        return json.loads(shards_env)
+    return None
 
+def prompt_for_database():
+    """Original interactive flow: returns (db_handler, db_paths)."""
     while True:
         db_type_choice = input("Select database type: (S)QLite or (M)ySQL? (S/M): ").strip().upper()
         if db_type_choice == 'S':
-            db_handler = importlib.import_module('db_handlers.sqlite_handler')
+            handler = importlib.import_module(HANDLER_MODULES['S'])
             print("SQLite handler loaded.")
-            db_handler.setup_sample_database() # Call setup from the selected handler
+            handler.setup_sample_database() # Call setup from the selected handler
             # For sample, db_paths remains None, get_all_shard_engines will use defaults
             print("Sample database setup complete. Proceeding with analysis.")
-            
-            # Discover schema for the newly created sample database
-            # Call discover_schema from identification.py, passing the db_handler and None for paths
-            discovered_schema = discover_schema(db_handler, None) 
-            if not discovered_schema['shards']:
-                print("Error: Could not discover schema for sample database. Exiting.")
-                exit()
-            break
+            return handler, None
         elif db_type_choice == 'M':
-            db_handler = importlib.import_module('db_handlers.mysql_handler')
+            handler = importlib.import_module(HANDLER_MODULES['M'])
             print("MySQL handler loaded.")
-            db_handler.setup_sample_database() # Provide setup instructions for MySQL
+            handler.setup_sample_database() # Provide setup instructions for MySQL
 
             mysql_conn_details = []
             num_shards_str = input("Enter the number of MySQL databases/shards you want to analyze: ").strip()
@@ -60,7 +93,7 @@ if __name__ == '__main__':
                 user = input(f"User: ").strip()
                 password = input(f"Password: ").strip()
                 db_name = input(f"Database Name: ").strip()
-                
+
                 try:
                     port = int(port_str)
                 except ValueError:
@@ -74,44 +107,84 @@ if __name__ == '__main__':
                     'password': password,
                     'db_name': db_name
                 })
-            
+
             # For MySQL, mysql_conn_details is the 'db_paths' equivalent for get_all_shard_engines
-            db_paths = mysql_conn_details 
-            
-            # Discover schema for the existing databases
-            # Call discover_schema from identification.py, passing the db_handler and connection details
-            discovered_schema = discover_schema(db_handler, db_paths)
-            if not discovered_schema['shards']:
-                print("Error: Could not discover schema for existing databases. Exiting.")
-                exit()
-
-            print("Existing database connections accepted and schema discovered. Proceeding with analysis.")
-            break
+            print("Existing database connections accepted. Proceeding with analysis.")
+            return handler, mysql_conn_details
         else:
             print("Invalid choice. Please enter 'S' or 'M'.")
 
-    # Pass the selected db_handler and discovered_schema, AND db_paths (connection_details) to all analysis functions
-    print("\nAnalyzing query performance dynamically...")
-    query_performance_data = analyze_queries_dynamic(db_handler, discovered_schema, db_paths)
-    
-    print("\nChecking for missing and redundant indexes dynamically...")
-    index_issues, index_suggestions = check_indexes_dynamic(db_handler, discovered_schema, db_paths)
-    
-    print("\nChecking for data integrity issues dynamically...")
-    integrity_issues = check_data_integrity_dynamic(db_handler, discovered_schema, db_paths)
-
-    print("\nChecking password and sensitive data security dynamically...")
-    security_findings = check_security_dynamic(db_handler, discovered_schema, db_paths)
-
-    print("\nAnalyzing trigger performance dynamically...")
-    trigger_performance_results = analyze_triggers_dynamic(db_handler, discovered_schema, db_paths)
-    
-    print("\nAnalyzing relationship (JOIN) performance dynamically...")
-    relationship_perf_results = analyze_relationships_performance(db_handler, discovered_schema, db_paths)
+if __name__ == '__main__':
+    args = parse_args()
+    print("Starting dynamic database analysis tool...")
+
+    if args.interactive or not args.db_type:
+        db_handler, db_paths = prompt_for_database()
+    else:
+        db_handler = importlib.import_module(HANDLER_MODULES[args.db_type])
+        db_paths = load_shards(args)
+        if db_paths is None and args.db_type == 'S':
+            # No shards given: build and analyze the bundled sample databases
+            db_handler.setup_sample_database()
+            print("Sample database setup complete. Proceeding with analysis.")
+        elif db_paths is None:
+            print("Error: MySQL requires --shards-json or DBANALYZER_SHARDS. Exiting.")
+            exit()
+
+    # Build the shard engines once and share them with schema discovery and
+    # every analysis function; each step previously rebuilt (and disposed)
+    # its own connections.
+    with AnalyzerSession(db_handler, db_paths) as engines:
+        # Cached discovery: unchanged schemas are reloaded from disk
+        discovered_schema = discover_schema_cached(db_handler, engines)
+        if not discovered_schema['shards']:
+            print("Error: Could not discover schema. Exiting.")
+            exit()
+
+        analyses = [
+            ('queries', "Analyzing query performance dynamically", analyze_queries_dynamic),
+            ('indexes', "Checking for missing and redundant indexes dynamically", check_indexes_dynamic),
+            ('integrity', "Checking for data integrity issues dynamically", check_data_integrity_dynamic),
+            ('security', "Checking password and sensitive data security dynamically", check_security_dynamic),
+            ('triggers', "Analyzing trigger performance dynamically", analyze_triggers_dynamic),
+            ('relationships', "Analyzing relationship (JOIN) performance dynamically", analyze_relationships_performance),
+        ]
+
+        results = {}
+        if getattr(db_handler, 'supports_concurrent_analyzers', lambda: False)():
+            # The analyses are independent and I/O-bound, so running them in
+            # threads overlaps their SQL round-trips. Each thread checks out
+            # its own pooled connection from the shared engines.
+            for _, message, _ in analyses:
+                print(f"\n{message} (in parallel)...")
+            with ThreadPoolExecutor(max_workers=len(analyses)) as executor:
+                futures = {
+                    name: executor.submit(fn, db_handler, discovered_schema, engines)
+                    for name, _, fn in analyses
+                }
+                results = {name: future.result() for name, future in futures.items()}
+        else:
+            # SQLite's StaticPool shares one DBAPI connection per shard, so
+            # the analyses (one of which writes inside a transaction and
+            # toggles foreign-key enforcement) must run one at a time.
+            for name, message, fn in analyses:
+                print(f"\n{message}...")
+                results[name] = fn(db_handler, discovered_schema, engines)
+
+        query_performance_data = results['queries']
+        index_issues, index_suggestions = results['indexes']
+        integrity_issues = results['integrity']
+        security_findings = results['security']
+        trigger_performance_results = results['triggers']
+        relationship_perf_results = results['relationships']
 
     print("\nGenerating comprehensive HTML report...")
-    # The visualization.py does not need the db_handler directly, as it only consumes the results
-    html_report_content = generate_html_report(
+    # The visualization.py does not need the db_handler directly, as it only consumes the results.
+    # Re-runs against an unchanged database reuse a content-hashed cached
+    # copy instead of re-rendering.
+    report_filename = 'database_report.html.gz' if args.gzip else 'database_report.html'
+    if render_report_cached(
+        report_filename,
         query_performance_data,
         index_issues,
         integrity_issues,
@@ -119,12 +192,13 @@ if __name__ == '__main__':
         index_suggestions,
         trigger_performance_results,
         relationship_perf_results,
-        discovered_schema
-    )
-    
-    report_filename = 'database_report.html'
-    with open(report_filename, 'w', encoding='utf-8') as f:
-        f.write(html_report_content)
-    
+        discovered_schema,
+        compress=args.gzip
+    ):
+        print("Report inputs unchanged since a previous run; reused the cached report.")
+    # The report references the D3 chart code as a sibling static asset
+    # instead of inlining it into every generated file.
+    write_chart_asset(os.path.dirname(report_filename))
+
     print(f"\nComprehensive database report saved as '{report_filename}'")
     print("\nDynamic database analysis complete.")
@@ -0,0 +1,88 @@
+// D3.js chart rendering for the dbAnalyzer HTML report.
+// The report injects its data as `window.__queryData` in a tiny inline
+// script; keeping this file static lets the browser cache it across reports.
+// The payload is columnar ({query, t, opt, label} parallel arrays) to keep
+// the inline JSON small; expand it into the row objects the chart binds to.
+const columns = window.__queryData || {};
+const queryData = Array.from({length: columns.t ? columns.t.length : 0}, (_, i) => ({
+    'Query': columns.query[i],
+    'Numeric Execution Time (s)': columns.t[i],
+    'Optimized': columns.opt[i],
+    'Short Label': columns.label[i],
+}));
+
+if (queryData.length > 0) {
+    const margin = {top: 40, right: 20, bottom: 120, left: 70}, // Increased bottom margin for x-axis labels
+          width = 1000 - margin.left - margin.right,
+          height = 500 - margin.top - margin.bottom;
+
+    const svg = d3.select("#query-performance-chart")
+        .append("svg")
+        .attr("width", width + margin.left + margin.right)
+        .attr("height", height + margin.top + margin.bottom)
+        .append("g")
+        .attr("transform", `translate(${margin.left},${margin.top})`);
+
+    const x = d3.scaleBand()
+        .range([0, width])
+        .padding(0.1)
+        .domain(queryData.map(d => d['Short Label'])); // Use Short Label for x-axis
+
+    const y = d3.scaleLinear()
+        .range([height, 0])
+        .domain([0, d3.max(queryData, d => d['Numeric Execution Time (s)']) * 1.1]); // Add 10% padding
+
+    // Add X axis (no labels, just the scale)
+    svg.append("g")
+        .attr("transform", `translate(0,${height})`)
+        .call(d3.axisBottom(x).tickFormat("")); // Hide tick labels
+
+    // Add Y axis
+    svg.append("g")
+        .call(d3.axisLeft(y));
+
+    // Y-axis label
+    svg.append("text")
+        .attr("transform", "rotate(-90)")
+        .attr("y", 0 - margin.left + 10) // Adjusted position
+        .attr("x", 0 - (height / 2))
+        .attr("dy", "1em")
+        .style("text-anchor", "middle")
+        .text("Execution Time (s)");
+
+    // X-axis label
+    svg.append("text")
+        .attr("transform", `translate(${width / 2}, ${height + margin.bottom - 20})`) // Adjusted position
+        .style("text-anchor", "middle")
+        .text("Query Identifier (Hover for Details)");
+
+
+    // Tooltip div
+    const tooltip = d3.select("body").append("div")
+        .attr("class", "tooltip");
+
+    // Add bars
+    svg.selectAll(".bar")
+        .data(queryData)
+        .enter().append("rect")
+        .attr("class", d => `bar ${d.Optimized ? 'optimized' : 'unoptimized'}`)
+        .attr("x", d => x(d['Short Label']))
+        .attr("width", x.bandwidth())
+        .attr("y", d => y(d['Numeric Execution Time (s)']))
+        .attr("height", d => height - y(d['Numeric Execution Time (s)']))
+        .on("mouseover", function(event, d) {
+            tooltip.transition()
+                .duration(200)
+                .style("opacity", .9);
+            tooltip.html(`<strong>Query:</strong> ${d.Query}<br/><strong>Time:</strong> ${d['Numeric Execution Time (s)'].toFixed(4)}s<br/><strong>Optimized:</strong> ${d.Optimized ? 'Yes' : 'No'}`)
+                .style("left", (event.pageX + 10) + "px")
+                .style("top", (event.pageY - 28) + "px");
+        })
+        .on("mouseout", function(d) {
+            tooltip.transition()
+                .duration(500)
+                .style("opacity", 0);
+        });
+} else {
+    d3.select("#query-performance-chart").html("<p class='text-red-500 font-semibold'>Query performance plot could not be generated due to empty or invalid data.</p>");
+}
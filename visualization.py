@@ -1,38 +1,24 @@
+import gzip
+import hashlib
+import html
+import os
+import re
+import shutil
+import sys
 import pandas as pd
 import base64
-from io import BytesIO
+from io import BytesIO, StringIO
 import json # Import json to pass data to JavaScript
 
-def generate_html_report(query_data, index_issues, integrity_issues, security_findings, index_suggestions, trigger_perf_results, relationship_perf_results, discovered_schema):
-    """
-    Generates a comprehensive HTML report of the database analysis with collapsible sections
-    and an interactive D3.js query performance plot.
-    """
-    # Prepare query data for D3.js plot
-    # Ensure numeric conversion is robust and create the column
-    query_data['Numeric Execution Time (s)'] = pd.to_numeric(
-        query_data['Execution Time (s)'], errors='coerce'
-    ).fillna(0)
-
-    # Ensure 'Short Label' is always created, even if query_data is empty
-    if not query_data.empty:
-        query_data['Short Label'] = [f'Query {i+1}' for i in range(len(query_data))]
-    else:
-        query_data['Short Label'] = [] # Add an empty list for consistency if DataFrame is empty
-
-    # Convert DataFrame to JSON for D3.js
-    # Only include necessary columns for the plot
-    # Check if query_data is empty before attempting to select columns, to avoid issues
-    if not query_data.empty:
-        plot_data_json = query_data[['Query', 'Numeric Execution Time (s)', 'Optimized', 'Short Label']].to_json(orient='records')
-    else:
-        plot_data_json = "[]" # Empty JSON array if no data
-
-    # No longer generating a base64 image from matplotlib.
-    # The D3.js chart will be rendered directly into the HTML.
+try:
+    import orjson # C serializer; markedly faster than pandas' to_json path
+except ImportError:
+    orjson = None
 
-    # 3. Build the HTML content
-    html_content = f"""
+# Static document head and styles, hoisted so stream_html_report doesn't
+# rebuild (or brace-escape) ~4KB of fixed content per call. Plain strings:
+# the CSS braces need no doubling here.
+_HTML_HEAD = """
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -43,40 +29,40 @@ def generate_html_report(query_data, index_issues, integrity_issues, security_fi
         <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700&display=swap" rel="stylesheet">
         <script src="https://d3js.org/d3.v7.min.js"></script> <!-- D3.js library -->
         <style>
-            body {{
+            body {
                 font-family: 'Inter', sans-serif;
                 background-color: #f3f4f6;
                 color: #374151;
-            }}
-            .container {{
+            }
+            .container {
                 max-width: 1200px;
-            }}
-            table {{
+            }
+            table {
                 width: 100%;
                 border-collapse: collapse;
-            }}
-            th, td {{
+            }
+            th, td {
                 padding: 12px 15px;
                 text-align: left;
                 border-bottom: 1px solid #e5e7eb;
-            }}
-            th {{
+            }
+            th {
                 background-color: #e0e7ff; /* Light blue for headers */
                 font-weight: 600;
                 color: #374151;
-            }}
-            tr:nth-child(even) {{
+            }
+            tr:nth-child(even) {
                 background-color: #f9fafb;
-            }}
-            .section-title {{
+            }
+            .section-title {
                 border-bottom: 2px solid #6366f1; /* Indigo border */
                 padding-bottom: 8px;
                 margin-bottom: 24px;
-            }}
-            .issue-critical {{ color: #ef4444; font-weight: 600; }} /* Red */
-            .issue-warning {{ color: #f59e0b; }} /* Orange */
-            .issue-good {{ color: #22c55e; }} /* Green */
-            .code-block {{
+            }
+            .issue-critical { color: #ef4444; font-weight: 600; } /* Red */
+            .issue-warning { color: #f59e0b; } /* Orange */
+            .issue-good { color: #22c55e; } /* Green */
+            .code-block {
                 background-color: #1f2937; /* Dark gray */
                 color: #f9fafb; /* Light text */
                 padding: 16px;
@@ -84,14 +70,14 @@ def generate_html_report(query_data, index_issues, integrity_issues, security_fi
                 overflow-x: auto;
                 font-family: monospace;
                 font-size: 0.9em;
-            }}
-            .sub-section {{
+            }
+            .sub-section {
                 background-color: #f0f4ff;
                 padding: 16px;
                 border-radius: 8px;
                 margin-bottom: 16px;
-            }}
-            details > summary {{
+            }
+            details > summary {
                 cursor: pointer;
                 padding: 10px 0;
                 font-size: 1.5rem; /* Matches h2 size */
@@ -101,35 +87,35 @@ def generate_html_report(query_data, index_issues, integrity_issues, security_fi
                 position: relative;
                 border-bottom: 2px solid #6366f1;
                 margin-bottom: 24px;
-            }}
-            details > summary::-webkit-details-marker {{
+            }
+            details > summary::-webkit-details-marker {
                 display: none;
-            }}
-            details > summary::before {{
+            }
+            details > summary::before {
                 content: '+';
                 position: absolute;
                 left: -20px; /* Adjust as needed */
                 font-size: 1.2em;
                 font-weight: bold;
                 color: #6366f1;
-            }}
-            details[open] > summary::before {{
+            }
+            details[open] > summary::before {
                 content: '-';
-            }}
-            details[open] > summary {{
+            }
+            details[open] > summary {
                 border-bottom-color: #a5b4fc; /* Lighter border when open */
-            }}
+            }
             /* D3.js specific styles */
-            .bar {{
+            .bar {
                 fill: steelblue;
-            }}
-            .bar.unoptimized {{
+            }
+            .bar.unoptimized {
                 fill: #ef4444; /* Red for unoptimized */
-            }}
-            .bar.optimized {{
+            }
+            .bar.optimized {
                 fill: #22c55e; /* Green for optimized */
-            }}
-            .tooltip {{
+            }
+            .tooltip {
                 position: absolute;
                 text-align: center;
                 padding: 8px;
@@ -142,47 +128,243 @@ def generate_html_report(query_data, index_issues, integrity_issues, security_fi
                 transition: opacity 0.2s;
                 max-width: 300px; /* Limit tooltip width */
                 word-wrap: break-word; /* Break long words */
-            }}
+            }
         </style>
     </head>
     <body class="p-8">
         <div class="container mx-auto bg-white shadow-lg rounded-lg p-8">
             <h1 class="text-4xl font-bold text-center text-indigo-700 mb-8">Dynamic Database Health and Performance Report</h1>
-            <p class="text-center text-gray-600 mb-12">Generated on {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+            """
+
+_SCHEMA_OVERVIEW_OPEN = """
 
             <details> <!-- Collapsed by default -->
                 <summary>0. Discovered Database Schema Overview</summary>
                 <p class="text-gray-700 mb-4">This section provides an overview of the database structure discovered by the analyzer across all connected shards. This includes tables, columns, and relationships.</p>
                 <div class="space-y-6">
                     """
-    for shard_name, shard_info in discovered_schema['shards'].items():
-        html_content += f"""
+
+def _rows_to_html(records, cols):
+    """
+    Hand-rolled table emitter over pre-extracted row tuples. DataFrame.to_html
+    runs per-cell formatter dispatch through pandas' formatting pipeline; a
+    plain join over plain tuples skips all of it. Columns named with an
+    '__html' suffix are already escaped (see stream_html_report) and are
+    labelled by their base name; everything else is numeric/generated and safe
+    to emit as-is.
+    """
+    header = ''.join(
+        f"<th>{html.escape(col[:-6] if col.endswith('__html') else col)}</th>"
+        for col in cols
+    )
+    # One str.join per row instead of an f-string per cell; for wide reports
+    # the per-cell generator overhead dominated the row build.
+    rows = ''.join(
+        f"<tr><td>{'</td><td>'.join(map(str, row))}</td></tr>"
+        for row in records
+    )
+    return (f'<table class="table-auto w-full text-sm rounded-lg">'
+            f'<thead><tr>{header}</tr></thead><tbody>{rows}</tbody></table>')
+
+# One compiled scan for the severity tag instead of two substring probes
+_SECURITY_TAG_RE = re.compile(r'\b(CRITICAL|WARNING)\b')
+_SECURITY_TAG_CLASSES = {'CRITICAL': 'issue-critical', 'WARNING': 'issue-warning'}
+
+def _security_class(finding):
+    """Picks the CSS class for a security finding's severity."""
+    match = _SECURITY_TAG_RE.search(finding)
+    return _SECURITY_TAG_CLASSES[match.group(1)] if match else 'issue-good'
+
+def _trigger_lines(finding):
+    """Formats one TriggerFinding into the report's list lines."""
+    if finding.skipped:
+        return [f"[{finding.shard}] {finding.skipped}"]
+    if finding.error:
+        return [f"[{finding.shard}] Error testing trigger '{finding.trigger}' on '{finding.table}': {finding.error}"]
+    lines = [f"[{finding.shard}] Trigger '{finding.trigger}' on '{finding.table}': Inserted {finding.num_inserts} records in {finding.duration:.4f} seconds."]
+    if finding.audit_log_count is not None:
+        lines.append(f"  - Audit log entries after test: {finding.audit_log_count}.")
+    return lines
+
+def _relationship_lines(finding):
+    """Formats one RelationshipFinding into (text, is_warning) report lines."""
+    if finding.skipped:
+        return [(f"[{finding.shard}] {finding.skipped}", False)]
+    lines = [
+        (f"[{finding.shard}] Analyzing relationship: '{finding.from_table}' ({finding.from_column}) JOIN '{finding.to_table}' ({finding.to_column})", False),
+        (f"  - Index on FK source ({finding.from_table}.{finding.from_column}): {'Exists' if finding.has_fk_index else 'MISSING'}", not finding.has_fk_index),
+        (f"  - Index on FK target ({finding.to_table}.{finding.to_column}): {'Exists' if finding.has_pk_index else 'MISSING'}", not finding.has_pk_index),
+    ]
+    if finding.explain_skipped:
+        lines.append(("  - Performance appears reasonable (indexes present, small tables; EXPLAIN skipped).", False))
+    elif finding.error:
+        lines.append((f"  - Error analyzing join performance: {finding.error}", True))
+    else:
+        lines.append((f"  - Query Plan:\n{finding.plan}", False))
+        if finding.full_scan:
+            lines.append(("  - WARNING: Join query involves full table scan without index. Consider adding indexes on join columns.", True))
+        elif not finding.has_fk_index:
+            lines.append((f"  - SUGGESTION: Add index on '{finding.from_table}.{finding.from_column}' to improve join performance.", False))
+        else:
+            lines.append(("  - Performance appears reasonable for this synthetic join.", False))
+    return lines
+
+# Preformatted "nothing to report" fragments for sections 2-7. A healthy
+# database hits every one of them, so the empty branch writes a constant
+# instead of running the per-item rendering path.
+_NO_INDEX_ISSUES = """<li>No significant index issues detected.</li>"""
+_NO_INTEGRITY_ISSUES = """<li>No significant data integrity issues detected.</li>"""
+_NO_SECURITY_FINDINGS = """<li>No specific password or sensitive data security findings.</li>"""
+_NO_TRIGGER_RESULTS = """<li>No trigger performance results available or no 'AFTER INSERT' triggers found.</li>"""
+_NO_RELATIONSHIP_RESULTS = """<li>No foreign key relationships found for analysis.</li>"""
+_NO_INDEX_SUGGESTIONS = "No specific index optimization SQL suggestions at this time."
+
+def _render_index_issues(index_issues):
+    """Section 2 body: one joined fragment for the index issue list."""
+    return ''.join(f"""<li><span class="issue-warning">{issue}</span></li>""" for issue in index_issues)
+
+def _render_integrity_issues(integrity_issues):
+    """Section 3 body: integrity issues, critical ones tagged as such."""
+    return ''.join(
+        f"""<li><span class="{'issue-critical' if 'Foreign Key Violation' in issue or 'Duplicate Unique Constraint' in issue else 'issue-warning'}">{issue}</span></li>"""
+        for issue in integrity_issues)
+
+def _render_security_findings(security_findings):
+    """Section 4 body: security findings with severity-derived classes."""
+    return ''.join(
+        f"""<li><span class="{_security_class(finding)}">{finding}</span></li>"""
+        for finding in security_findings)
+
+def _render_trigger_results(trigger_perf_results):
+    """Section 5 body: trigger timing findings."""
+    return ''.join(
+        f"""<li><span class="text-gray-700">{line}</span></li>"""
+        for finding in trigger_perf_results for line in _trigger_lines(finding))
+
+def _render_relationship_results(relationship_perf_results):
+    """Section 6 body: JOIN analysis findings."""
+    return ''.join(
+        f"""<li><span class="{'issue-warning' if is_warning else 'text-gray-700'}">{line}</span></li>"""
+        for finding in relationship_perf_results for line, is_warning in _relationship_lines(finding))
+
+def stream_html_report(out_file, query_data, index_issues, integrity_issues, security_findings, index_suggestions, trigger_perf_results, relationship_perf_results, discovered_schema):
+    """
+    Writes a comprehensive HTML report of the database analysis with collapsible
+    sections and an interactive D3.js query performance plot. Sections are
+    written to out_file as they are built, so peak memory stays at one section
+    rather than the whole report.
+    """
+    write = out_file.write
+
+    # Prepare query data for D3.js plot. Everything derived here stays in
+    # locals: assigning helper columns back into query_data leaked them to
+    # the caller and forced a block-manager rebuild per new column.
+    numeric_times = pd.to_numeric(
+        query_data['Execution Time (s)'], errors='coerce'
+    ).fillna(0)
+
+    # Vectorized string concat instead of one Python f-string per row;
+    # an empty frame yields an empty label list.
+    if not query_data.empty:
+        short_labels = ('Query ' + pd.RangeIndex(1, len(query_data) + 1).astype(str)).tolist()
+    else:
+        short_labels = []
+
+    # Extract every column the emitters need in a single pass. The plot JSON,
+    # summary table and detailed-plans sections used to each slice their own
+    # sub-frame (a fresh DataFrame plus column copies per section); all of
+    # them now index into these plain Python lists.
+    cols = {
+        name: query_data[name].to_numpy().tolist()
+        for name in ('Query', 'Optimized')
+    }
+    times_list = numeric_times.tolist()
+    # Escape the user-controlled text exactly once; the summary table and the
+    # detailed-plans section both read these, and raw SQL no longer reaches
+    # the markup unescaped. 'Execution Time (s)' is included because failed
+    # queries carry the driver's error string — which embeds the SQL — in
+    # that cell, not a number.
+    escaped = {
+        name: [html.escape(str(value)) for value in query_data[name].to_numpy()]
+        for name in ('Query', 'Query Plan', 'Suggested Optimization', 'Execution Time (s)')
+    }
+
+    # Serialize the chart payload column-wise for D3.js. An array of objects
+    # repeats the four key strings per row — roughly half the payload for
+    # large reports — whereas four parallel arrays carry each key once;
+    # report_chart.js re-expands them into row objects.
+    # The chart only resolves ~4 significant digits, so quantize the times to
+    # float32: orjson emits the shortest round-tripping repr per value, where
+    # float64 often costs 17 digits. The stdlib fallback rounds to the same
+    # effective precision.
+    plot_columns = {
+        'query': cols['Query'],
+        'opt': cols['Optimized'],
+        'label': short_labels,
+    }
+    if orjson is not None:
+        plot_columns['t'] = numeric_times.astype('float32').to_numpy()
+        plot_data_json = orjson.dumps(plot_columns, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    else:
+        plot_columns['t'] = [round(duration, 5) for duration in times_list]
+        plot_data_json = json.dumps(plot_columns, default=float)
+
+    # Row tuples for both query sections, zipped straight from the columns
+    query_records = list(zip(
+        short_labels, escaped['Query'], escaped['Execution Time (s)'],
+        cols['Optimized'], escaped['Suggested Optimization'], escaped['Query Plan'],
+    ))
+
+    # No longer generating a base64 image from matplotlib.
+    # The D3.js chart will be rendered directly into the HTML.
+
+    # 3. Write the HTML content
+    write(_HTML_HEAD)
+    write(f"""<p class="text-center text-gray-600 mb-12">Generated on {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}</p>""")
+    write(_SCHEMA_OVERVIEW_OPEN)
+    # Flatten the nested schema dicts once; the emission loop below then only
+    # unpacks tuples instead of repeating dict lookups per table and column.
+    # Column types (and to a lesser degree names) repeat across thousands of
+    # columns, so interning collapses the duplicates to one str object each.
+    shards_flat = [
+        (shard_name,
+         [(table_name,
+           ', '.join(table_details['primary_key']) if table_details['primary_key'] else 'None',
+           [(sys.intern(col['name']), sys.intern(str(col['type'])), col['nullable']) for col in table_details['columns']])
+          for table_name, table_details in shard_info['tables'].items()],
+         [(trigger['name'], trigger['sql']) for trigger in shard_info['triggers']])
+        for shard_name, shard_info in discovered_schema['shards'].items()
+    ]
+    for shard_name, tables_flat, triggers_flat in shards_flat:
+        write(f"""
                     <div class="sub-section">
                         <h3 class="text-xl font-semibold text-indigo-700 mb-4">Shard: {shard_name}</h3>
                         <h4 class="text-lg font-semibold text-gray-800 mb-2">Tables:</h4>
                         <ul class="list-disc list-inside space-y-1 text-gray-700 mb-4">
-                            """
-        for table_name, table_details in shard_info['tables'].items():
-            html_content += f"""<li><strong>{table_name}</strong> (PK: {', '.join(table_details['primary_key']) if table_details['primary_key'] else 'None'})"""
-            html_content += f"""<details><summary class="text-base font-normal text-gray-700 my-1">Columns & Details</summary><ul class="list-circle list-inside ml-4">"""
-            for col in table_details['columns']:
-                html_content += f"""<li>{col['name']} (<span class="font-mono">{col['type']}</span>) {'(Nullable)' if col['nullable'] else ''}</li>"""
-            html_content += f"""</ul></details></li>"""
-        html_content += """
+                            """)
+        for table_name, pk_label, cols_flat in tables_flat:
+            # One preformatted fragment per table instead of a write per column
+            cols_html = ''.join(
+                f"""<li>{col_name} (<span class="font-mono">{col_type}</span>) {'(Nullable)' if nullable else ''}</li>"""
+                for col_name, col_type, nullable in cols_flat
+            )
+            write(f"""<li><strong>{table_name}</strong> (PK: {pk_label})"""
+                  f"""<details><summary class="text-base font-normal text-gray-700 my-1">Columns & Details</summary><ul class="list-circle list-inside ml-4">{cols_html}</ul></details></li>""")
+        write("""
                         </ul>
                         <h4 class="text-lg font-semibold text-gray-800 mb-2">Triggers:</h4>
                         <ul class="list-disc list-inside space-y-1 text-gray-700">
-                            """
-        if shard_info['triggers']:
-            for trigger in shard_info['triggers']:
-                html_content += f"""<li><strong>{trigger['name']}</strong>: <pre class="code-block text-xs">{trigger['sql']}</pre></li>"""
+                            """)
+        if triggers_flat:
+            for trigger_name, trigger_sql in triggers_flat:
+                write(f"""<li><strong>{trigger_name}</strong>: <pre class="code-block text-xs">{trigger_sql}</pre></li>""")
         else:
-            html_content += """<li>No triggers found in this shard.</li>"""
-        html_content += """
+            write("""<li>No triggers found in this shard.</li>""")
+        write("""
                         </ul>
                     </div>
-                    """
-    html_content += """
+                    """)
+    write("""
                 </div>
             </details>
 
@@ -194,33 +376,35 @@ def generate_html_report(query_data, index_issues, integrity_issues, security_fi
                 </div>
                 <h3 class="text-xl font-semibold text-gray-800 mb-4">Query Performance Details</h3>
                 <div class="overflow-x-auto overflow-y-auto max-h-64 md:max-h-96 rounded-lg shadow-md"> <!-- Added overflow and max-height classes -->
-                    """
-    if not query_data.empty:
+                    """)
+    if query_records:
         # Display Short Label and then the full Query for reference
-        html_content += query_data[['Short Label', 'Query', 'Execution Time (s)', 'Optimized', 'Suggested Optimization']].to_html(index=False, classes='table-auto w-full text-sm rounded-lg')
+        write(_rows_to_html(
+            (row[:5] for row in query_records),
+            ['Short Label', 'Query__html', 'Execution Time (s)__html', 'Optimized', 'Suggested Optimization__html']))
     else:
-        html_content += f"""<p class="text-gray-600">No query performance data available.</p>"""
-    html_content += """
+        write(f"""<p class="text-gray-600">No query performance data available.</p>""")
+    write("""
                 </div>
-                
+
                 <details>
                     <summary class="text-xl font-semibold text-gray-800 mt-8 mb-4">Detailed Query Plans</summary>
                     <p class="text-gray-700 mb-4">Understanding the query plan is crucial for identifying bottlenecks. Look for "SCAN TABLE" without "USING INDEX" as a potential area for improvement.</p>
                     <div class="space-y-6">
-                        """
-    if not query_data.empty:
-        for _, row in query_data.iterrows():
-            html_content += f"""
+                        """)
+    if query_records:
+        for _, query, _, _, suggested, plan in query_records:
+            write(f"""
                         <div class="bg-gray-50 p-4 rounded-lg shadow-sm border border-gray-200">
-                            <p class="font-medium text-gray-900 mb-2">Query: <span class="font-normal">{row['Query']}</span></p>
-                            <p class="font-medium text-gray-900 mb-2">Suggested Optimization: <span class="font-normal">{row['Suggested Optimization']}</span></p>
+                            <p class="font-medium text-gray-900 mb-2">Query: <span class="font-normal">{query}</span></p>
+                            <p class="font-medium text-gray-900 mb-2">Suggested Optimization: <span class="font-normal">{suggested}</span></p>
                             <h4 class="text-lg font-semibold text-gray-800 mb-2">Query Plan:</h4>
-                            <pre class="code-block">{row['Query Plan']}</pre>
+                            <pre class="code-block">{plan}</pre>
                         </div>
-                        """
+                        """)
     else:
-        html_content += f"""<p class="text-gray-600">No detailed query plans available.</p>"""
-    html_content += """
+        write(f"""<p class="text-gray-600">No detailed query plans available.</p>""")
+    write("""
                     </div>
                 </details>
             </details>
@@ -229,13 +413,9 @@ def generate_html_report(query_data, index_issues, integrity_issues, security_fi
                 <summary>2. Index Analysis</summary>
                 <p class="text-gray-700 mb-4">This section highlights potential issues related to database indexes, including missing indexes on foreign keys or frequently queried columns, and potentially redundant indexes.</p>
                 <ul class="list-disc list-inside space-y-2 text-gray-700">
-                    """
-    if index_issues:
-        for issue in index_issues:
-            html_content += f"""<li><span class="issue-warning">{issue}</span></li>"""
-    else:
-        html_content += """<li>No significant index issues detected.</li>"""
-    html_content += """
+                    """)
+    write(_render_index_issues(index_issues) if index_issues else _NO_INDEX_ISSUES)
+    write("""
                 </ul>
             </details>
 
@@ -243,16 +423,9 @@ def generate_html_report(query_data, index_issues, integrity_issues, security_fi
                 <summary>3. Data Integrity Checks</summary>
                 <p class="text-gray-700 mb-4">Ensuring data integrity is vital for database reliability. This section reports on issues like foreign key violations and duplicate unique entries.</p>
                 <ul class="list-disc list-inside space-y-2 text-gray-700">
-                    """
-    if integrity_issues:
-        for issue in integrity_issues:
-            if "Foreign Key Violation" in issue or "Duplicate Unique Constraint" in issue:
-                html_content += f"""<li><span class="issue-critical">{issue}</span></li>"""
-            else:
-                html_content += f"""<li><span class="issue-warning">{issue}</span></li>"""
-    else:
-        html_content += """<li>No significant data integrity issues detected.</li>"""
-    html_content += """
+                    """)
+    write(_render_integrity_issues(integrity_issues) if integrity_issues else _NO_INTEGRITY_ISSUES)
+    write("""
                 </ul>
             </details>
 
@@ -260,18 +433,9 @@ def generate_html_report(query_data, index_issues, integrity_issues, security_fi
                 <summary>4. Password and Sensitive Data Security Findings</summary>
                 <p class="text-gray-700 mb-4">This analysis provides a heuristic check on the security of password fields and identifies other potentially sensitive data (e.g., emails, SSNs, credit cards). It's crucial to use strong encryption/hashing for sensitive data.</p>
                 <ul class="list-disc list-inside space-y-2 text-gray-700">
-                    """
-    if security_findings:
-        for finding in security_findings:
-            if "CRITICAL" in finding:
-                html_content += f"""<li><span class="issue-critical">{finding}</span></li>"""
-            elif "WARNING" in finding:
-                html_content += f"""<li><span class="issue-warning">{finding}</span></li>"""
-            else:
-                html_content += f"""<li><span class="issue-good">{finding}</span></li>"""
-    else:
-        html_content += """<li>No specific password or sensitive data security findings.</li>"""
-    html_content += """
+                    """)
+    write(_render_security_findings(security_findings) if security_findings else _NO_SECURITY_FINDINGS)
+    write("""
                 </ul>
             </details>
 
@@ -279,13 +443,9 @@ def generate_html_report(query_data, index_issues, integrity_issues, security_fi
                 <summary>5. Trigger Performance Analysis</summary>
                 <p class="text-gray-700 mb-4">Triggers can introduce overhead. This section measures the performance impact of discovered 'AFTER INSERT' triggers by simulating batch inserts.</p>
                 <ul class="list-disc list-inside space-y-2 text-gray-700">
-                    """
-    if trigger_perf_results:
-        for result in trigger_perf_results:
-            html_content += f"""<li><span class="text-gray-700">{result}</span></li>"""
-    else:
-        html_content += """<li>No trigger performance results available or no 'AFTER INSERT' triggers found.</li>"""
-    html_content += """
+                    """)
+    write(_render_trigger_results(trigger_perf_results) if trigger_perf_results else _NO_TRIGGER_RESULTS)
+    write("""
                 </ul>
             </details>
 
@@ -293,29 +453,18 @@ def generate_html_report(query_data, index_issues, integrity_issues, security_fi
                 <summary>6. Relationship Performance Analysis (JOINs)</summary>
                 <p class="text-gray-700 mb-4">This section analyzes the performance implications of foreign key relationships by testing synthetic JOIN queries. Missing indexes on join columns are a common cause of slow queries.</p>
                 <ul class="list-disc list-inside space-y-2 text-gray-700">
-                    """
-    if relationship_perf_results:
-        for result in relationship_perf_results:
-            if "WARNING" in result or "MISSING" in result or "Error" in result:
-                html_content += f"""<li><span class="issue-warning">{result}</span></li>"""
-            else:
-                html_content += f"""<li><span class="text-gray-700">{result}</span></li>"""
-    else:
-        html_content += """<li>No foreign key relationships found for analysis.</li>"""
-    html_content += """
+                    """)
+    write(_render_relationship_results(relationship_perf_results) if relationship_perf_results else _NO_RELATIONSHIP_RESULTS)
+    write("""
                 </ul>
             </details>
 
             <details>
                 <summary>7. Optimization SQL Suggestions</summary>
                 <p class="text-gray-700 mb-4">Based on the index analysis, here are some SQL commands you might consider applying to optimize your database. Always test these suggestions in a development environment first.</p>
-                <pre class="code-block">"""
-    if index_suggestions:
-        for suggestion in index_suggestions:
-            html_content += f"{suggestion}\n"
-    else:
-        html_content += "No specific index optimization SQL suggestions at this time."
-    html_content += """</pre>
+                <pre class="code-block">""")
+    write(''.join(f"{suggestion}\n" for suggestion in index_suggestions) if index_suggestions else _NO_INDEX_SUGGESTIONS)
+    write("""</pre>
             </details>
 
             <footer class="text-center text-gray-500 mt-12 pt-8 border-t border-gray-200">
@@ -323,87 +472,117 @@ def generate_html_report(query_data, index_issues, integrity_issues, security_fi
             </footer>
         </div>
 
-        <script>
-            // D3.js Chart Rendering
-            const queryData = """ + plot_data_json + """; // Data from Python
-
-            if (queryData.length > 0) {
-                const margin = {top: 40, right: 20, bottom: 120, left: 70}, // Increased bottom margin for x-axis labels
-                      width = 1000 - margin.left - margin.right,
-                      height = 500 - margin.top - margin.bottom;
-
-                const svg = d3.select("#query-performance-chart")
-                    .append("svg")
-                    .attr("width", width + margin.left + margin.right)
-                    .attr("height", height + margin.top + margin.bottom)
-                    .append("g")
-                    .attr("transform", `translate(${margin.left},${margin.top})`);
-
-                const x = d3.scaleBand()
-                    .range([0, width])
-                    .padding(0.1)
-                    .domain(queryData.map(d => d['Short Label'])); // Use Short Label for x-axis
-
-                const y = d3.scaleLinear()
-                    .range([height, 0])
-                    .domain([0, d3.max(queryData, d => d['Numeric Execution Time (s)']) * 1.1]); // Add 10% padding
-
-                // Add X axis (no labels, just the scale)
-                svg.append("g")
-                    .attr("transform", `translate(0,${height})`)
-                    .call(d3.axisBottom(x).tickFormat("")); // Hide tick labels
-
-                // Add Y axis
-                svg.append("g")
-                    .call(d3.axisLeft(y));
-
-                // Y-axis label
-                svg.append("text")
-                    .attr("transform", "rotate(-90)")
-                    .attr("y", 0 - margin.left + 10) // Adjusted position
-                    .attr("x", 0 - (height / 2))
-                    .attr("dy", "1em")
-                    .style("text-anchor", "middle")
-                    .text("Execution Time (s)");
-
-                // X-axis label
-                svg.append("text")
-                    .attr("transform", `translate(${width / 2}, ${height + margin.bottom - 20})`) // Adjusted position
-                    .style("text-anchor", "middle")
-                    .text("Query Identifier (Hover for Details)");
-
-
-                // Tooltip div
-                const tooltip = d3.select("body").append("div")
-                    .attr("class", "tooltip");
-
-                // Add bars
-                svg.selectAll(".bar")
-                    .data(queryData)
-                    .enter().append("rect")
-                    .attr("class", d => `bar ${d.Optimized ? 'optimized' : 'unoptimized'}`)
-                    .attr("x", d => x(d['Short Label']))
-                    .attr("width", x.bandwidth())
-                    .attr("y", d => y(d['Numeric Execution Time (s)']))
-                    .attr("height", d => height - y(d['Numeric Execution Time (s)']))
-                    .on("mouseover", function(event, d) {
-                        tooltip.transition()
-                            .duration(200)
-                            .style("opacity", .9);
-                        tooltip.html(`<strong>Query:</strong> ${d.Query}<br/><strong>Time:</strong> ${d['Numeric Execution Time (s)'].toFixed(4)}s<br/><strong>Optimized:</strong> ${d.Optimized ? 'Yes' : 'No'}`)
-                            .style("left", (event.pageX + 10) + "px")
-                            .style("top", (event.pageY - 28) + "px");
-                    })
-                    .on("mouseout", function(d) {
-                        tooltip.transition()
-                            .duration(500)
-                            .style("opacity", 0);
-                    });
-            } else {
-                d3.select("#query-performance-chart").html("<p class='text-red-500 font-semibold'>Query performance plot could not be generated due to empty or invalid data.</p>");
-            }
-        </script>
+        <script>window.__queryData = """ + plot_data_json + """;</script>
+        <script src="report_chart.js"></script>
     </body>
     </html>
+    """)
+
+
+_REPORT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'dbAnalyzer')
+_REPORT_CACHE_MAX_ENTRIES = 20
+
+def _report_cache_key(query_data, index_issues, integrity_issues, security_findings, index_suggestions, trigger_perf_results, relationship_perf_results, discovered_schema):
+    """
+    BLAKE2b digest over the report's stable inputs. Measured wall-clock
+    fields (per-query execution times, trigger insert durations) jitter on
+    every run even against an unchanged database, so they are excluded —
+    otherwise no two runs would ever share a key. hash_pandas_object covers
+    the query frame in one vectorized pass; the remaining findings and the
+    schema dict have deterministic, content-bearing reprs.
+    """
+    key = hashlib.blake2b(digest_size=16)
+    stable_columns = [name for name in query_data.columns if name != 'Execution Time (s)']
+    key.update(pd.util.hash_pandas_object(query_data[stable_columns], index=False).values.tobytes())
+    for finding in trigger_perf_results:
+        key.update(repr((finding.shard, finding.trigger, finding.table, finding.num_inserts,
+                         finding.audit_log_count, finding.error, finding.skipped)).encode('utf-8'))
+    for part in (index_issues, integrity_issues, security_findings, index_suggestions,
+                 relationship_perf_results, discovered_schema):
+        key.update(repr(part).encode('utf-8'))
+    return key.hexdigest()
+
+def _evict_report_cache():
+    """Drops the oldest cached reports beyond _REPORT_CACHE_MAX_ENTRIES."""
+    try:
+        entries = [
+            os.path.join(_REPORT_CACHE_DIR, name)
+            for name in os.listdir(_REPORT_CACHE_DIR) if name.endswith('.html')
+        ]
+        entries.sort(key=os.path.getmtime)
+        for path in entries[:-_REPORT_CACHE_MAX_ENTRIES]:
+            os.remove(path)
+    except OSError:
+        pass # Cache housekeeping is best-effort
+
+def render_report_cached(out_path, query_data, index_issues, integrity_issues, security_findings, index_suggestions, trigger_perf_results, relationship_perf_results, discovered_schema, compress=False):
+    """
+    Streams the report to out_path, reusing a content-addressed copy from
+    ~/.cache/dbAnalyzer when every stable input matches a previous run —
+    repeated runs against an unchanged database then skip rendering (a reused
+    report carries the timings measured when it was first rendered). With
+    compress=True, out_path is written gzip-compressed (reports are mostly
+    repeated HTML/CSS tokens and shrink roughly 10x). Returns True when the
+    cached copy was reused.
+    """
+    key = _report_cache_key(query_data, index_issues, integrity_issues, security_findings,
+                            index_suggestions, trigger_perf_results, relationship_perf_results,
+                            discovered_schema)
+    cache_path = os.path.join(_REPORT_CACHE_DIR, f'{key}.html')
+    cached = os.path.exists(cache_path)
+    if cached:
+        # Refresh the mtime so eviction drops the least recently used entry
+        try:
+            os.utime(cache_path, None)
+        except OSError:
+            pass
+    else:
+        # Render into the cache (always plain HTML, so later runs can deliver
+        # it either way), streaming straight to disk with a 1MB buffer rather
+        # than joining one giant in-memory string first.
+        os.makedirs(_REPORT_CACHE_DIR, exist_ok=True)
+        tmp_path = cache_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8', buffering=1 << 20) as out_file:
+                stream_html_report(out_file, query_data, index_issues, integrity_issues, security_findings,
+                                   index_suggestions, trigger_perf_results, relationship_perf_results,
+                                   discovered_schema)
+            os.replace(tmp_path, cache_path) # Atomic: a failed render never leaves a partial blob
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        _evict_report_cache()
+    if compress:
+        with open(cache_path, 'rb') as source, gzip.open(out_path, 'wb', compresslevel=6) as target:
+            shutil.copyfileobj(source, target)
+    else:
+        shutil.copyfile(cache_path, out_path)
+    return cached
+
+
+def write_chart_asset(directory):
+    """
+    Copies the static D3 chart script (report_chart.js) next to a generated
+    report. The ~3KB of chart code used to be inlined into every report; as a
+    sibling asset it is written once and cached by the browser across reports.
+    """
+    source = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'report_chart.js')
+    destination = os.path.join(directory or '.', 'report_chart.js')
+    if os.path.abspath(source) != os.path.abspath(destination):
+        shutil.copyfile(source, destination)
+    return destination
+
+
+def generate_html_report(query_data, index_issues, integrity_issues, security_findings, index_suggestions, trigger_perf_results, relationship_perf_results, discovered_schema, compress=False):
+    """
+    Builds the full report as a single in-memory string. Kept for callers that
+    want the content directly; main streams straight to disk instead via
+    render_report_cached. With compress=True, returns the report as a gzip
+    bytes blob instead.
     """
-    return html_content
+    buf = StringIO()
+    stream_html_report(buf, query_data, index_issues, integrity_issues, security_findings, index_suggestions, trigger_perf_results, relationship_perf_results, discovered_schema)
+    if compress:
+        return gzip.compress(buf.getvalue().encode('utf-8'), compresslevel=6)
+    return buf.getvalue()